@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, courses, chat, payments, enrollments
+from app.api.v1.endpoints import auth, courses, chat, payments, enrollments, progress, media
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -7,3 +7,5 @@ api_router.include_router(courses.router, prefix="/courses", tags=["courses"])
 api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
 api_router.include_router(payments.router, prefix="/payments", tags=["payments"])
 api_router.include_router(enrollments.router, prefix="/enrollments", tags=["enrollments"])
+api_router.include_router(progress.router, prefix="/progress", tags=["progress"])
+api_router.include_router(media.router, prefix="/media", tags=["media"])
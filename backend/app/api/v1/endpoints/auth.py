@@ -4,7 +4,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db, AsyncSessionLocal
 from app.core import security
 from app.models.user import User
 from app.schemas import user as user_schema
@@ -74,28 +74,31 @@ async def login_access_token(
         "token_type": "bearer",
     }
 
-async def get_current_user(
-    db: AsyncSession = Depends(get_db),
-    token: str = Depends(security.oauth2_scheme)
-) -> User:
-    try:
-        payload = security.jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
-        token_data = payload.get("sub")
-        if token_data is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-    except (security.jwt.JWTError, Exception):
+def get_current_user_id(token: str = Depends(security.oauth2_scheme)) -> int:
+    """
+    Authenticated user id from the token alone, for high-frequency endpoints
+    that do not need the User row.
+    """
+    user_id = security.decode_access_token(token)
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-        
-    result = await db.execute(select(User).where(User.id == int(token_data)))
+    return user_id
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_read_db),
+    user_id: int = Depends(get_current_user_id)
+) -> User:
+    result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalars().first()
+    if user is None and "replica" in db.info:
+        # A replica can lag behind a fresh signup; confirm on the primary
+        async with AsyncSessionLocal() as primary:
+            result = await primary.execute(select(User).where(User.id == user_id))
+            user = result.scalars().first()
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -1,28 +1,79 @@
+import asyncio
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
-from app.db.session import get_db
+from app.core.config import settings
+from app.core.tasks import spawn
+from app.db.session import get_db, get_read_db
 from app.models.course import Course, Module, Video
 from app.models.user import User
-from app.api.v1.endpoints.auth import get_current_user
+from app.api.v1.endpoints.auth import get_current_user, get_current_user_id
 from app.schemas import course as schemas
 from app.services.storage import get_storage_service, StorageService
+from app.services.transcode import transcode_video
+from app.services.aggregates import bump_course, course_of_module
+from app.services import course_import
+from app.services.recommendations import recommendation_service
 
 router = APIRouter()
 
 @router.post("/", response_model=schemas.Course)
 async def create_course(course: schemas.CourseCreate, db: AsyncSession = Depends(get_db)):
-    db_course = Course(**course.model_dump())
+    # A new course has no modules; say so instead of lazy loading them on serialization
+    db_course = Course(**course.model_dump(), modules=[])
     db.add(db_course)
     await db.commit()
-    await db.refresh(db_course)
     return db_course
 
+@router.post("/import", response_model=schemas.ImportResult)
+async def import_courses(
+    courses: List[schemas.CourseImport],
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Create complete course/module/video trees in one transaction. The whole
+    payload is validated before anything is written.
+    """
+    result = await course_import.insert_course_trees(db, courses)
+    await db.commit()
+    return result
+
+@router.post("/import/ndjson", response_model=schemas.ImportJob, status_code=202)
+async def import_courses_ndjson(
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Import a large catalog sent as NDJSON, one course tree per line. The body
+    is spooled to disk and imported in the background; poll the returned job.
+    """
+    too_large = HTTPException(status_code=413, detail=f"Import is larger than {settings.IMPORT_MAX_BYTES} bytes")
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > settings.IMPORT_MAX_BYTES:
+        raise too_large
+    try:
+        path = await course_import.spool_upload(request.stream(), settings.IMPORT_MAX_BYTES)
+    except course_import.UploadTooLarge:
+        raise too_large
+    job = schemas.ImportJob(id=course_import.new_job_id(), status="queued")
+    await course_import.save_job(job)
+    # Detached so the import holds no request session or admission slot
+    spawn(course_import.run_ndjson_import(job.id, path))
+    return job
+
+@router.get("/import/{job_id}", response_model=schemas.ImportJob)
+async def read_import_job(job_id: str, current_user: User = Depends(get_current_user)):
+    job = await course_import.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
 @router.get("/", response_model=List[schemas.Course])
-async def read_courses(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
+async def read_courses(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(
         select(Course)
         .options(selectinload(Course.modules).selectinload(Module.videos))
@@ -33,11 +84,46 @@ async def read_courses(skip: int = 0, limit: int = 100, db: AsyncSession = Depen
     courses = result.scalars().all()
     return courses
 
+@router.get("/catalog", response_model=List[schemas.CourseSummary])
+async def read_catalog(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_read_db)):
+    """
+    Published courses for listing pages, with their aggregates but without
+    the module/video tree. A single scan of the published-courses index.
+    """
+    result = await db.execute(
+        select(Course)
+        .where(Course.is_published == True)
+        .order_by(Course.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+async def _published_summaries(db: AsyncSession, ranked: List[tuple]) -> List[Course]:
+    """Load courses for (course_id, score) pairs, keeping the ranking order."""
+    if not ranked:
+        return []
+    result = await db.execute(
+        select(Course).where(Course.id.in_([course_id for course_id, _ in ranked]), Course.is_published == True)
+    )
+    by_id = {course.id: course for course in result.scalars().all()}
+    return [by_id[course_id] for course_id, _ in ranked if course_id in by_id]
+
+@router.get("/recommended", response_model=List[schemas.CourseSummary])
+async def read_recommended_courses(
+    limit: int = 10,
+    db: AsyncSession = Depends(get_read_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """Courses enrolled in by learners who share the current user's courses."""
+    limit = max(1, min(limit, 50))
+    return await _published_summaries(db, recommendation_service.for_user(user_id, limit))
+
 @router.get("/my-courses", response_model=List[schemas.Course])
 async def read_my_courses(
     skip: int = 0, 
     limit: int = 100, 
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     # In a real app, we would filter by instructor_id=current_user.id
@@ -53,7 +139,7 @@ async def read_my_courses(
     return courses
 
 @router.get("/{course_id}", response_model=schemas.Course)
-async def read_course(course_id: int, db: AsyncSession = Depends(get_db)):
+async def read_course(course_id: int, db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(
         select(Course).options(selectinload(Course.modules).selectinload(Module.videos)).where(Course.id == course_id)
     )
@@ -62,6 +148,12 @@ async def read_course(course_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Course not found")
     return course
 
+@router.get("/{course_id}/related", response_model=List[schemas.CourseSummary])
+async def read_related_courses(course_id: int, limit: int = 10, db: AsyncSession = Depends(get_read_db)):
+    """Learners also enrolled in: served from the precomputed co-occurrence index."""
+    limit = max(1, min(limit, 20))
+    return await _published_summaries(db, recommendation_service.related(course_id, limit))
+
 @router.patch("/{course_id}", response_model=schemas.Course)
 async def update_course(
     course_id: int, 
@@ -89,10 +181,12 @@ async def update_course(
 
 @router.post("/{course_id}/modules", response_model=schemas.Module)
 async def create_module(course_id: int, module: schemas.ModuleCreate, db: AsyncSession = Depends(get_db)):
-    db_module = Module(**module.model_dump(), course_id=course_id)
+    # The counter update doubles as the existence check
+    if not await bump_course(db, course_id, module_count=1):
+        raise HTTPException(status_code=404, detail="Course not found")
+    db_module = Module(**module.model_dump(), course_id=course_id, videos=[])
     db.add(db_module)
     await db.commit()
-    await db.refresh(db_module)
     return db_module
 
 @router.post("/{module_id}/videos", response_model=schemas.Video)
@@ -105,19 +199,43 @@ async def upload_video(
 ):
     # Save file
     import uuid
+    import shutil
+    import tempfile
+    from pathlib import Path
     file_extension = file.filename.split(".")[-1]
     file_name = f"{uuid.uuid4()}.{file_extension}"
     file_url = await storage.upload_file(file, file_name)
-    
-    # Create video record
-    video = Video(
-        title=title,
-        url=file_url,
-        module_id=module_id
-    )
-    db.add(video)
-    await db.commit()
-    await db.refresh(video)
+
+    # Keep a local copy for the transcoder; the upload is closed once we return
+    await file.seek(0)
+    def copy_upload() -> Path:
+        with tempfile.NamedTemporaryFile(suffix=f".{file_extension}", delete=False) as out:
+            try:
+                shutil.copyfileobj(file.file, out)
+            except BaseException:
+                Path(out.name).unlink(missing_ok=True)
+                raise
+        return Path(out.name)
+    source = await asyncio.to_thread(copy_upload)
+
+    try:
+        # Create video record
+        video = Video(
+            title=title,
+            url=file_url,
+            module_id=module_id
+        )
+        db.add(video)
+        await bump_course(db, course_of_module(module_id), video_count=1)
+        await db.commit()
+    except BaseException:
+        source.unlink(missing_ok=True)
+        raise
+
+    # Package as adaptive-bitrate HLS outside the request, so the encode holds
+    # neither this request's DB connection nor its admission slot. The job
+    # opens its own session and fills in hls_url when done.
+    spawn(transcode_video(video.id, source, storage))
 
     # Trigger Transcription (Background Task in real app)
     # For now, we just print that we would do it
@@ -4,12 +4,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.api.v1.endpoints.auth import get_current_user
 from app.models.user import User
-from app.models.course import Course
+from app.models.course import Course, Module
 from app.models.enrollment import Enrollment
 from app.schemas import course as course_schemas
+from app.services.aggregates import bump_course
+from app.services.entitlements import entitlement_service
 
 router = APIRouter()
 
@@ -39,22 +41,31 @@ async def enroll_course(
     # Create enrollment
     enrollment = Enrollment(user_id=current_user.id, course_id=course_id)
     db.add(enrollment)
+    await bump_course(db, course_id, enrollment_count=1)
     await db.commit()
+    await entitlement_service.invalidate(current_user.id)
     
     return {"message": "Successfully enrolled"}
 
-@router.get("/my-courses", response_model=List[course_schemas.Course])
+@router.get("/my-courses", response_model=List[course_schemas.EnrolledCourse])
 async def read_my_enrollments(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     # Fetch courses the user is enrolled in
-    # We join Enrollment and Course to get the course details
+    # We join Enrollment and Course to get the course details, plus the
+    # completion count kept up to date by the progress flusher
     result = await db.execute(
-        select(Course)
+        select(Course, Enrollment.completed_videos)
         .join(Enrollment)
         .where(Enrollment.user_id == current_user.id)
-        .options(selectinload(Course.modules).selectinload(course_schemas.Module.videos)) # Eager load for display
+        .options(selectinload(Course.modules).selectinload(Module.videos)) # Eager load for display
     )
-    courses = result.scalars().all()
+    courses = []
+    for course, completed_videos in result.all():
+        enrolled = course_schemas.EnrolledCourse.model_validate(course)
+        enrolled.completed_videos = completed_videos or 0
+        if course.video_count:
+            enrolled.completion_percent = round(100 * enrolled.completed_videos / course.video_count, 1)
+        courses.append(enrolled)
     return courses
@@ -0,0 +1,48 @@
+from datetime import timedelta
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import security
+from app.core.config import settings
+from app.db.session import get_read_db
+from app.api.v1.endpoints.auth import get_current_user_id
+from app.models.course import Video
+from app.schemas import course as schemas
+from app.services.entitlements import entitlement_service
+
+router = APIRouter()
+
+@router.post("/videos/{video_id}/token", response_model=schemas.MediaAccess)
+async def issue_media_token(
+    video_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """
+    Signed playback URLs for a video the user is enrolled for. The grant sits
+    in the path (/static/m/<token>/...), so HLS players carry it to variant
+    playlists and segments, which they resolve relative to the master playlist.
+    """
+    video = await db.get(Video, video_id)
+    if video is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    if not await entitlement_service.can_access_video(user_id, video_id):
+        raise HTTPException(status_code=403, detail="Not enrolled in this course")
+
+    expires = timedelta(minutes=settings.MEDIA_TOKEN_EXPIRE_MINUTES)
+    prefix = f"/static/m/{security.create_media_token(video_id, expires)}/"
+
+    def signed(url: Optional[str]) -> Optional[str]:
+        # External (e.g. S3) URLs are not served by us and pass through unchanged,
+        # as does everything when /static is public
+        if settings.PROTECT_MEDIA and url and url.startswith("/static/"):
+            return prefix + url[len("/static/"):]
+        return url
+
+    return schemas.MediaAccess(
+        video_id=video_id,
+        url=signed(video.url),
+        hls_url=signed(video.hls_url),
+        expires_in=int(expires.total_seconds()),
+    )
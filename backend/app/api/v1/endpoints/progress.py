@@ -0,0 +1,66 @@
+from typing import List
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_
+from sqlalchemy.future import select
+
+from app.db.session import get_read_db
+from app.api.v1.endpoints.auth import get_current_user_id
+from app.models.course import Module, Video
+from app.models.progress import VideoProgress
+from app.schemas import progress as schemas
+from app.services.progress import progress_service
+
+router = APIRouter()
+
+@router.post("/heartbeat", status_code=202)
+async def record_heartbeat(
+    heartbeat: schemas.Heartbeat,
+    user_id: int = Depends(get_current_user_id)
+):
+    """
+    Record the playback position. Buffered and written in bulk by the
+    progress flusher, so this never touches the database.
+    """
+    await progress_service.record_heartbeat(
+        user_id, heartbeat.video_id, heartbeat.position, heartbeat.completed
+    )
+    return {"message": "Progress recorded"}
+
+@router.get("/courses/{course_id}", response_model=List[schemas.VideoProgress])
+async def read_course_progress(
+    course_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """
+    Resume position and completion for every video of a course the user has
+    watched, including heartbeats not yet flushed.
+    """
+    # Every video of the course, with the stored progress if any
+    result = await db.execute(
+        select(Video.id, VideoProgress.position, VideoProgress.completed)
+        .join(Module, Module.id == Video.module_id)
+        .outerjoin(
+            VideoProgress,
+            and_(VideoProgress.video_id == Video.id, VideoProgress.user_id == user_id),
+        )
+        .where(Module.course_id == course_id)
+    )
+    stored = result.all()
+    try:
+        pending = await progress_service.pending_for_user(user_id)
+    except Exception as e:
+        # Stored progress is still worth returning; pending heartbeats land on the next flush
+        print(f"Pending progress lookup failed: {e}")
+        pending = {}
+
+    progress = []
+    for video_id, position, completed in stored:
+        if video_id in pending:
+            pending_position, pending_completed = pending[video_id]
+            position, completed = pending_position, pending_completed or bool(completed)
+        elif position is None:
+            continue
+        progress.append(schemas.VideoProgress(video_id=video_id, position=position, completed=completed))
+    return progress
@@ -1,7 +1,22 @@
+import json
 from typing import List, Union, Optional, Dict, Any
 from pydantic import AnyHttpUrl, validator
 from pydantic_settings import BaseSettings
 
+def normalize_db_url(v: str) -> str:
+    if v.startswith("postgres://"):
+        v = v.replace("postgres://", "postgresql+asyncpg://", 1)
+    elif v.startswith("postgresql://") and not v.startswith("postgresql+asyncpg://"):
+        v = v.replace("postgresql://", "postgresql+asyncpg://", 1)
+    
+    # Remove unsupported query params for asyncpg
+    if "sslmode=" in v or "channel_binding=" in v:
+        base_url, query = v.split("?", 1) if "?" in v else (v, "")
+        if query:
+            params = [p for p in query.split("&") if not p.startswith("sslmode=") and not p.startswith("channel_binding=")]
+            v = base_url + ("?" + "&".join(params) if params else "")
+    return v
+
 class Settings(BaseSettings):
     PROJECT_NAME: str = "TeachMe Platform"
     BACKEND_CORS_ORIGINS: Union[List[str], str] = []
@@ -19,21 +34,50 @@ class Settings(BaseSettings):
     @validator("DATABASE_URL", pre=True)
     def assemble_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
         if isinstance(v, str):
-            if v.startswith("postgres://"):
-                v = v.replace("postgres://", "postgresql+asyncpg://", 1)
-            elif v.startswith("postgresql://") and not v.startswith("postgresql+asyncpg://"):
-                v = v.replace("postgresql://", "postgresql+asyncpg://", 1)
-            
-            # Remove unsupported query params for asyncpg
-            if "sslmode=" in v or "channel_binding=" in v:
-                base_url, query = v.split("?", 1) if "?" in v else (v, "")
-                if query:
-                    params = [p for p in query.split("&") if not p.startswith("sslmode=") and not p.startswith("channel_binding=")]
-                    v = base_url + ("?" + "&".join(params) if params else "")
+            return normalize_db_url(v)
         return v
 
+    # Read replicas, comma separated. GET handlers are routed here when set.
+    DATABASE_REPLICA_URLS: Union[List[str], str] = []
+
+    @validator("DATABASE_REPLICA_URLS", pre=True)
+    def assemble_replica_connections(cls, v: Union[str, List[str]]) -> List[str]:
+        if isinstance(v, str) and not v.startswith("["):
+            v = [i.strip() for i in v.split(",") if i.strip()]
+        elif isinstance(v, str):
+            v = json.loads(v)
+        if isinstance(v, list):
+            return [normalize_db_url(url) for url in v]
+        raise ValueError(v)
+
+    # Reads from a client stay on the primary for this long after its own writes
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0
+    DB_REPLICA_HEALTH_INTERVAL: float = 5.0
+
     REDIS_URL: str = "redis://redis:6379/0"
 
+    # Admission control: per-route rate limits live in app/services/rate_limit.py
+    RATE_LIMIT_ENABLED: bool = True
+    MAX_CONCURRENT_REQUESTS: int = 200
+    MAX_CONCURRENT_MEDIA: int = 1000  # Separate cap for long-running /static downloads
+    # Reverse proxies in front of the app that append to X-Forwarded-For (1 on Render).
+    # 0 means clients connect directly and the socket address is used.
+    TRUSTED_PROXY_HOPS: int = 0
+
+    # Seconds between bulk writes of buffered watch-progress heartbeats
+    PROGRESS_FLUSH_INTERVAL: float = 10.0
+
+    # Largest NDJSON catalog accepted by /courses/import/ndjson; larger bodies get 413
+    IMPORT_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # Seconds between incremental refreshes of the course co-occurrence index
+    RECOMMENDATIONS_REFRESH_INTERVAL: float = 60.0
+
+    # Serve uploaded and packaged video only to users enrolled in its course
+    PROTECT_MEDIA: bool = True
+    # Lifetime of the per-video grants embedded in media URLs; covers a long lecture
+    MEDIA_TOKEN_EXPIRE_MINUTES: int = 240
+
     STRIPE_SECRET_KEY: str = "sk_test_mock_key"
     STRIPE_PUBLISHABLE_KEY: str = "pk_test_mock_key"
 
@@ -0,0 +1,148 @@
+import os
+from typing import Optional
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.staticfiles import StaticFiles
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core import security
+from app.services.entitlements import entitlement_service
+from app.services.rate_limit import RateLimiter, get_rate_limiter, match_policy, retry_after_header
+
+# Never shed these, so load balancers can still see the instance while it is saturated
+EXEMPT_PATHS = {"/health", "/"}
+# Media downloads stream for minutes; they get their own cap so viewers cannot starve the API
+MEDIA_PREFIX = "/static/"
+
+class AdmissionControlMiddleware:
+    """
+    Rejects requests before any route, DB or CPU work runs:
+    503 when more than `max_concurrent` API requests (or `max_media_concurrent`
+    media downloads) are already in flight,
+    429 when the route's rate policy is exhausted for the client.
+
+    Written as plain ASGI rather than BaseHTTPMiddleware so the happy path
+    costs a counter check and, for limited routes, one Redis round trip.
+    """
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_concurrent: int = 200,
+        max_media_concurrent: int = 1000,
+        trusted_proxy_hops: int = 0,
+        limiter: RateLimiter = None,
+    ):
+        self.app = app
+        self.trusted_proxy_hops = trusted_proxy_hops
+        self.max_concurrent = max_concurrent
+        self.max_media_concurrent = max_media_concurrent
+        self.limiter = limiter
+        self.in_flight = 0
+        self.media_in_flight = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["path"].startswith(MEDIA_PREFIX):
+            await self._media(scope, receive, send)
+            return
+
+        if self.max_concurrent and self.in_flight >= self.max_concurrent:
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry shortly"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        try:
+            policy = match_policy(scope["method"], scope["path"])
+            if policy is not None:
+                limiter = self.limiter or get_rate_limiter()
+                retry_after = await limiter.hit(self._client_key(scope), policy)
+                if retry_after:
+                    response = JSONResponse(
+                        {"detail": "Too many requests"},
+                        status_code=429,
+                        headers={"Retry-After": retry_after_header(retry_after)},
+                    )
+                    await response(scope, receive, send)
+                    return
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def _media(self, scope: Scope, receive: Receive, send: Send):
+        if self.max_media_concurrent and self.media_in_flight >= self.max_media_concurrent:
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry shortly"},
+                status_code=503,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+        self.media_in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.media_in_flight -= 1
+
+    def _client_key(self, scope: Scope) -> str:
+        """
+        The address rate limits are keyed on. Behind `trusted_proxy_hops`
+        proxies, it is that many entries from the right of X-Forwarded-For:
+        the address our outermost proxy saw. Entries further left are
+        supplied by the client and cannot be trusted.
+        """
+        if self.trusted_proxy_hops:
+            forwarded = Headers(scope=scope).get("x-forwarded-for", "")
+            hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+            if len(hops) >= self.trusted_proxy_hops:
+                return hops[-self.trusted_proxy_hops]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+class EntitledStaticFiles(StaticFiles):
+    """
+    Static media that only enrolled users may fetch, either:
+
+    - /static/m/<media token>/<path>: the token is a short-lived grant for one
+      video from POST /api/v1/media/videos/{id}/token. Relative URIs inside HLS
+      playlists resolve under the same prefix, so every segment carries it.
+      Checking it is a signature check, with no cache or DB lookup.
+    - /static/<path> with an enrolled user's bearer token in the
+      Authorization header, for API clients. Served from the entitlement cache.
+
+    Login tokens are never accepted in URLs, where logs and history keep them.
+    """
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            path = self.get_path(scope).replace(os.sep, "/")
+            parts = path.split("/", 2)
+            if parts[0] == "m" and len(parts) == 3:
+                video_id = security.decode_media_token(parts[1])
+                if video_id is None:
+                    await JSONResponse({"detail": "Media link expired or invalid"}, status_code=401)(scope, receive, send)
+                    return
+                if await entitlement_service.video_of_asset(parts[2]) != video_id:
+                    await JSONResponse({"detail": "Media link does not cover this file"}, status_code=403)(scope, receive, send)
+                    return
+                # Serve the file below the grant prefix
+                scope = {**scope, "path": scope["path"].replace(f"/m/{parts[1]}", "", 1)}
+            else:
+                user_id = security.decode_access_token(self._bearer_token(scope) or "")
+                if user_id is None:
+                    await JSONResponse({"detail": "Not authenticated"}, status_code=401)(scope, receive, send)
+                    return
+                if not await entitlement_service.can_access_asset(user_id, path):
+                    await JSONResponse({"detail": "Not enrolled in this course"}, status_code=403)(scope, receive, send)
+                    return
+        await super().__call__(scope, receive, send)
+
+    @staticmethod
+    def _bearer_token(scope: Scope) -> Optional[str]:
+        scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+        return token if scheme.lower() == "bearer" and token else None
@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Optional, Union
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 import bcrypt
@@ -21,6 +21,36 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta = Non
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def decode_access_token(token: str) -> Optional[int]:
+    """
+    Returns the user id carried by a valid token, or None. Signature check only,
+    no database lookup, so it is cheap enough for hot paths.
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        subject = payload.get("sub")
+        return int(subject) if subject is not None else None
+    except (jwt.JWTError, TypeError, ValueError):
+        return None
+
+def create_media_token(video_id: int, expires_delta: timedelta) -> str:
+    """
+    Grant to fetch one video's files under /static/m/<token>/. Carries no
+    "sub", so it is useless as a login token, and login tokens are not
+    accepted for media.
+    """
+    to_encode = {"exp": datetime.utcnow() + expires_delta, "vid": video_id}
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def decode_media_token(token: str) -> Optional[int]:
+    """Returns the video id a valid media token grants, or None."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        video_id = payload.get("vid")
+        return int(video_id) if video_id is not None else None
+    except (jwt.JWTError, TypeError, ValueError):
+        return None
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
@@ -0,0 +1,21 @@
+import asyncio
+from typing import Coroutine, Set
+
+_tasks: Set[asyncio.Task] = set()
+
+def spawn(coro: Coroutine) -> asyncio.Task:
+    """
+    Run a long job detached from the request that started it. Unlike a
+    BackgroundTask it holds no request-scoped DB session or admission slot;
+    jobs open their own sessions. The loop only keeps weak references to
+    tasks, so we hold one until the job finishes.
+    """
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+async def cancel_all():
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
@@ -0,0 +1,28 @@
+from typing import Optional
+from redis import asyncio as aioredis
+from app.core.config import settings
+
+_client: Optional[aioredis.Redis] = None
+
+def get_redis() -> Optional[aioredis.Redis]:
+    """
+    Shared Redis client, created lazily. Returns None when REDIS_URL is empty
+    so callers can fall back to their in-memory implementation.
+    """
+    global _client
+    if not settings.REDIS_URL:
+        return None
+    if _client is None:
+        _client = aioredis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=0.5,
+            socket_timeout=0.5,
+        )
+    return _client
+
+async def close_redis():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,14 +1,179 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+import asyncio
+import time
+from typing import Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine, async_sessionmaker
+from sqlalchemy.orm import Session
 from app.core.config import settings
+from app.core import security
+from app.core.tasks import spawn
+from app.db.redis import get_redis
 from app.models.course import Base
 
+class PrimarySession(Session):
+    pass
+
+@event.listens_for(PrimarySession, "after_commit")
+def _remember_commit(session: Session):
+    # Start the read-your-writes window at commit time, before the response
+    # is sent, for sessions opened by get_db on behalf of a request
+    request = session.info.get("request")
+    if request is not None:
+        db_router.mark_write(request_identity(request))
+
 engine = create_async_engine(settings.DATABASE_URL, echo=True)
-AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+AsyncSessionLocal = async_sessionmaker(
+    engine, class_=AsyncSession, sync_session_class=PrimarySession, expire_on_commit=False
+)
+
+class ReplicaRouter:
+    """
+    Picks the engine for read-only requests: a healthy replica, round robin,
+    unless the client wrote within the read-your-writes window or no replica
+    is healthy, in which case reads go to the primary.
+    """
+    def __init__(self, replica_urls: List[str], read_your_writes_seconds: float):
+        self.replicas: List[AsyncEngine] = [create_async_engine(url, echo=True) for url in replica_urls]
+        self.sessions = [
+            async_sessionmaker(replica, class_=AsyncSession, expire_on_commit=False)
+            for replica in self.replicas
+        ]
+        self.healthy = [True] * len(self.replicas)
+        self.window = read_your_writes_seconds
+        self.reads = {"primary": 0, "replica": 0}
+        self._next = 0
+        self._last_write: Dict[str, float] = {}
+        self.redis_cooldown = 5.0
+        self._redis_down_until = 0.0
+
+    def pick(self) -> Optional[int]:
+        for _ in range(len(self.replicas)):
+            index = self._next % len(self.replicas)
+            self._next += 1
+            if self.healthy[index]:
+                return index
+        return None
+
+    def mark_write(self, identity: str):
+        if not self.replicas:
+            return
+        now = time.monotonic()
+        self._last_write[identity] = now
+        if len(self._last_write) > 10_000:
+            self._last_write = {k: t for k, t in self._last_write.items() if now - t < self.window}
+        # Share the window with other workers; best effort, without delaying the commit
+        if get_redis() is not None and now >= self._redis_down_until:
+            spawn(self._share_write(identity))
+
+    async def _share_write(self, identity: str):
+        try:
+            await get_redis().set(f"rw:{identity}", 1, px=int(self.window * 1000))
+        except Exception as e:
+            self._redis_unavailable(e)
+
+    async def wrote_recently(self, identity: str) -> bool:
+        now = time.monotonic()
+        last = self._last_write.get(identity)
+        if last is not None and now - last < self.window:
+            return True
+        redis = get_redis()
+        # While Redis is down, skip it instead of paying a timeout per read;
+        # writes made through this worker are still tracked locally
+        if redis is None or now < self._redis_down_until:
+            return False
+        try:
+            return bool(await redis.exists(f"rw:{identity}"))
+        except Exception as e:
+            self._redis_unavailable(e)
+            # Cannot tell, so stay consistent and read from the primary
+            return True
+
+    def _redis_unavailable(self, error: Exception):
+        if time.monotonic() >= self._redis_down_until:
+            print(f"Replica router warning: Redis unavailable, tracking writes locally ({error})")
+        self._redis_down_until = time.monotonic() + self.redis_cooldown
+
+    @staticmethod
+    async def _ping(replica: AsyncEngine):
+        async with replica.connect() as conn:
+            await conn.execute(text("SELECT 1"))
 
-async def get_db():
+    async def check_health(self):
+        for index, replica in enumerate(self.replicas):
+            try:
+                await asyncio.wait_for(self._ping(replica), timeout=2)
+                healthy = True
+            except Exception as e:
+                healthy = False
+                if self.healthy[index]:
+                    print(f"Replica {index} unhealthy, reads fall back to primary: {e}")
+            self.healthy[index] = healthy
+
+    async def run_health_checks(self, interval: float):
+        while True:
+            await self.check_health()
+            await asyncio.sleep(interval)
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.dispose()
+
+db_router = ReplicaRouter(settings.DATABASE_REPLICA_URLS, settings.DB_READ_YOUR_WRITES_SECONDS)
+
+def request_identity(request: Request) -> str:
+    """The authenticated user if there is one, otherwise the client address."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        user_id = security.decode_access_token(token)
+        if user_id is not None:
+            return f"user:{user_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+async def get_db(request: Request):
     async with AsyncSessionLocal() as session:
+        # Read by the after_commit hook to mark the client as a recent writer
+        session.info["request"] = request
         yield session
 
+async def get_read_db(request: Request):
+    """
+    Session for read-only handlers. Served by a replica when one is healthy
+    and the client has not written recently, otherwise by the primary.
+    """
+    index = None
+    if db_router.replicas and not await db_router.wrote_recently(request_identity(request)):
+        index = db_router.pick()
+
+    if index is None:
+        db_router.reads["primary"] += 1
+        async with AsyncSessionLocal() as session:
+            yield session
+    else:
+        db_router.reads["replica"] += 1
+        async with db_router.sessions[index]() as session:
+            session.info["replica"] = index
+            yield session
+
+def _pool_stats(name: str, target: AsyncEngine, healthy: bool = True) -> dict:
+    pool = target.pool
+    return {
+        "name": name,
+        "healthy": healthy,
+        "size": pool.size() if hasattr(pool, "size") else None,
+        "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+        "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+    }
+
+def pool_metrics() -> dict:
+    return {
+        "engines": [_pool_stats("primary", engine)] + [
+            _pool_stats(f"replica-{i}", replica, db_router.healthy[i])
+            for i, replica in enumerate(db_router.replicas)
+        ],
+        "reads": dict(db_router.reads),
+    }
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
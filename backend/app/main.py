@@ -1,13 +1,22 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
-from app.db.session import engine, Base
+from app.core.middleware import AdmissionControlMiddleware, EntitledStaticFiles
+from app.db.session import engine, Base, AsyncSessionLocal, db_router, pool_metrics
+from app.db.redis import close_redis
+from app.core.tasks import cancel_all as cancel_background_jobs
+from app.services.transcode import shutdown_pool
+from app.services.progress import progress_service
+from app.services.aggregates import reconcile_course_aggregates
+from app.services.recommendations import recommendation_service
+from app.services.entitlements import entitlement_service
 from app.api.v1.api import api_router
 import os
 # Import models to ensure they are registered with Base.metadata
-from app.models import course, user
+from app.models import course, user, enrollment, progress
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -34,7 +43,82 @@ async def lifespan(app: FastAPI):
             """))
         except Exception as e:
             print(f"Migration warning (enrollments): {e}")
+
+        # Migration: HLS packaging columns on videos
+        try:
+            await conn.execute(text("ALTER TABLE videos ADD COLUMN IF NOT EXISTS hls_url VARCHAR"))
+            await conn.execute(text("ALTER TABLE videos ADD COLUMN IF NOT EXISTS renditions JSON"))
+        except Exception as e:
+            print(f"Migration warning (videos): {e}")
+
+        # Migration: Course completion counter on enrollments
+        try:
+            await conn.execute(text("ALTER TABLE enrollments ADD COLUMN IF NOT EXISTS completed_videos INTEGER DEFAULT 0"))
+        except Exception as e:
+            print(f"Migration warning (enrollments.completed_videos): {e}")
+
+        # Migration: Denormalized course aggregates, backfilled by reconciliation
+        backfill_aggregates = False
+        try:
+            result = await conn.execute(text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'courses' AND column_name = 'video_count'"
+            ))
+            backfill_aggregates = result.first() is None
+            for column in ("enrollment_count", "module_count", "video_count", "total_duration"):
+                await conn.execute(text(f"ALTER TABLE courses ADD COLUMN IF NOT EXISTS {column} INTEGER DEFAULT 0"))
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_courses_published_id ON courses (id) WHERE is_published"))
+        except Exception as e:
+            print(f"Migration warning (courses aggregates): {e}")
+
+        # Migration: Index for resolving a media path to its video
+        try:
+            await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_videos_url ON videos (url)"))
+        except Exception as e:
+            print(f"Migration warning (videos.url index): {e}")
+
+    # One-off backfill when the aggregate columns were just added; afterwards
+    # drift is repaired by running `python -m app.services.aggregates`
+    if backfill_aggregates:
+        async with AsyncSessionLocal() as db:
+            try:
+                await reconcile_course_aggregates(db)
+                await db.commit()
+            except Exception as e:
+                print(f"Aggregate reconciliation warning: {e}")
+
+    try:
+        await entitlement_service.load_video_map()
+    except Exception as e:
+        print(f"Entitlement video map warning: {e}")
+
+    # Write-behind flush of buffered watch progress
+    progress_flusher = asyncio.create_task(progress_service.run(settings.PROGRESS_FLUSH_INTERVAL))
+    # Builds the recommendations index in the background, then keeps it fresh
+    recommendations_refresher = asyncio.create_task(
+        recommendation_service.run(settings.RECOMMENDATIONS_REFRESH_INTERVAL)
+    )
+    # Evicts cached entitlements when another worker records an enrollment
+    entitlement_listener = asyncio.create_task(entitlement_service.listen_for_invalidations())
+    replica_monitor = None
+    if db_router.replicas:
+        replica_monitor = asyncio.create_task(db_router.run_health_checks(settings.DB_REPLICA_HEALTH_INTERVAL))
     yield
+    if replica_monitor:
+        replica_monitor.cancel()
+    recommendations_refresher.cancel()
+    entitlement_listener.cancel()
+    progress_flusher.cancel()
+    # Let an in-progress flush requeue what it drained before the final flush
+    await asyncio.gather(progress_flusher, return_exceptions=True)
+    try:
+        await progress_service.flush()
+    except Exception as e:
+        print(f"Progress flush error on shutdown: {e}")
+    await cancel_background_jobs()
+    shutdown_pool()
+    await db_router.dispose()
+    await close_redis()
 
 app = FastAPI(
     title="TeachMe Platform API",
@@ -45,6 +129,16 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Shed excess load before any DB or CPU work. Added before CORS so that
+# 429/503 responses still carry CORS headers.
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        max_concurrent=settings.MAX_CONCURRENT_REQUESTS,
+        max_media_concurrent=settings.MAX_CONCURRENT_MEDIA,
+        trusted_proxy_hops=settings.TRUSTED_PROXY_HOPS,
+    )
+
 # Set all CORS enabled origins
 if settings.BACKEND_CORS_ORIGINS:
     app.add_middleware(
@@ -55,9 +149,10 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
-# Mount static files for local storage
+# Mount static files for local storage; video is only served to enrolled users
 os.makedirs("uploads", exist_ok=True)
-app.mount("/static", StaticFiles(directory="uploads"), name="static")
+static_files = EntitledStaticFiles if settings.PROTECT_MEDIA else StaticFiles
+app.mount("/static", static_files(directory="uploads"), name="static")
 
 app.include_router(api_router, prefix="/api/v1")
 
@@ -65,6 +160,10 @@ app.include_router(api_router, prefix="/api/v1")
 async def health_check():
     return {"status": "healthy", "service": "platform-api"}
 
+@app.get("/health/db")
+async def db_health_check():
+    return pool_metrics()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to TeachMe Platform API"}
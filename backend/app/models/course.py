@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import List, Optional
-from sqlalchemy import String, Text, Boolean, ForeignKey, DateTime, Integer
+from sqlalchemy import String, Text, Boolean, ForeignKey, DateTime, Integer, JSON, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship, DeclarativeBase
 
 class Base(DeclarativeBase):
@@ -8,6 +8,10 @@ class Base(DeclarativeBase):
 
 class Course(Base):
     __tablename__ = "courses"
+    __table_args__ = (
+        # Catalog listing: published courses in id order
+        Index("ix_courses_published_id", "id", postgresql_where=text("is_published")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     title: Mapped[str] = mapped_column(String, index=True)
@@ -17,6 +21,13 @@ class Course(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Denormalized aggregates, updated in the same transaction as the rows they
+    # count and recomputed by app.services.aggregates.reconcile_course_aggregates
+    enrollment_count: Mapped[int] = mapped_column(Integer, default=0)
+    module_count: Mapped[int] = mapped_column(Integer, default=0)
+    video_count: Mapped[int] = mapped_column(Integer, default=0)
+    total_duration: Mapped[int] = mapped_column(Integer, default=0)  # In seconds
+
     modules: Mapped[List["Module"]] = relationship(back_populates="course", cascade="all, delete-orphan")
     enrollments: Mapped[List["Enrollment"]] = relationship("Enrollment", back_populates="course", cascade="all, delete-orphan")
 
@@ -37,8 +48,10 @@ class Video(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     title: Mapped[str] = mapped_column(String)
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    url: Mapped[str] = mapped_column(String)  # Path to local file or S3 URL
+    url: Mapped[str] = mapped_column(String, index=True)  # Path to local file or S3 URL
     duration: Mapped[Optional[int]] = mapped_column(default=0)  # In seconds
+    hls_url: Mapped[Optional[str]] = mapped_column(String, nullable=True)  # Master playlist, set once transcoding finishes
+    renditions: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)  # [{name, width, height, bandwidth, url}]
     module_id: Mapped[int] = mapped_column(ForeignKey("modules.id"))
 
     module: Mapped["Module"] = relationship(back_populates="videos")
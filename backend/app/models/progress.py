@@ -0,0 +1,17 @@
+from datetime import datetime
+from sqlalchemy import ForeignKey, DateTime, Boolean, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.session import Base
+
+class VideoProgress(Base):
+    """
+    Latest watch position per user and video. Written in bulk by the progress
+    flusher, never per heartbeat.
+    """
+    __tablename__ = "video_progress"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    video_id: Mapped[int] = mapped_column(ForeignKey("videos.id"), primary_key=True)
+    position: Mapped[int] = mapped_column(Integer, default=0)  # In seconds
+    completed: Mapped[bool] = mapped_column(Boolean, default=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -1,6 +1,6 @@
 from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 # Video Schemas
 class VideoBase(BaseModel):
@@ -11,14 +11,30 @@ class VideoBase(BaseModel):
 class VideoCreate(VideoBase):
     url: str
 
+class Rendition(BaseModel):
+    name: str
+    width: int
+    height: int
+    bandwidth: int
+    url: str
+
 class Video(VideoBase):
     id: int
     url: str
     module_id: int
+    hls_url: Optional[str] = None
+    renditions: Optional[List[Rendition]] = None
 
     class Config:
         from_attributes = True
 
+class MediaAccess(BaseModel):
+    """Playback URLs carrying a short-lived grant for one video."""
+    video_id: int
+    url: str
+    hls_url: Optional[str] = None
+    expires_in: int  # Seconds
+
 # Module Schemas
 class ModuleBase(BaseModel):
     title: str
@@ -52,11 +68,50 @@ class CourseUpdate(BaseModel):
     is_published: Optional[bool] = None
 
 
-class Course(CourseBase):
+class CourseSummary(CourseBase):
     id: int
     created_at: datetime
     updated_at: datetime
+    enrollment_count: int = 0
+    module_count: int = 0
+    video_count: int = 0
+    total_duration: int = 0
+
+    class Config:
+        from_attributes = True
+
+class Course(CourseSummary):
     modules: List[Module] = []
 
     class Config:
         from_attributes = True
+
+class EnrolledCourse(Course):
+    completed_videos: int = 0
+    completion_percent: float = 0.0
+
+# Bulk import schemas
+class VideoImport(VideoBase):
+    url: str
+    duration: Optional[int] = Field(default=0, ge=0)
+
+class ModuleImport(ModuleBase):
+    videos: List[VideoImport] = []
+
+class CourseImport(CourseBase):
+    modules: List[ModuleImport] = []
+
+class ImportResult(BaseModel):
+    courses: int = 0
+    modules: int = 0
+    videos: int = 0
+    course_ids: List[int] = []
+
+class ImportJob(BaseModel):
+    id: str
+    status: str  # validating, importing, done, failed
+    total_courses: int = 0
+    courses: int = 0
+    modules: int = 0
+    videos: int = 0
+    error: Optional[str] = None
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+
+class Heartbeat(BaseModel):
+    video_id: int
+    position: int = Field(ge=0)  # In seconds
+    completed: bool = False
+
+class VideoProgress(BaseModel):
+    video_id: int
+    position: int
+    completed: bool
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,105 @@
+import asyncio
+from typing import Optional
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.course import Course, Module, Video
+from app.models.enrollment import Enrollment
+
+# pg advisory lock key so only one reconciliation runs at a time across workers
+RECONCILE_LOCK_ID = 0x636F7572  # "cour"
+
+def course_of_module(module_id: int):
+    return select(Module.course_id).where(Module.id == module_id).scalar_subquery()
+
+async def bump_course(db: AsyncSession, course_id, **deltas: int) -> int:
+    """
+    Adjust aggregate columns in place (e.g. video_count=1) within the caller's
+    transaction. `course_id` may be an id or a scalar subquery.
+    Returns the number of courses updated.
+    """
+    values = {name: getattr(Course, name) + delta for name, delta in deltas.items() if delta}
+    if not values:
+        return 0
+    # Counters changing is not an edit of the course itself
+    values["updated_at"] = Course.updated_at
+    result = await db.execute(
+        update(Course)
+        .where(Course.id == course_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+async def reconcile_course_aggregates(db: AsyncSession) -> Optional[int]:
+    """
+    Recompute every course's aggregates from the source tables in one
+    statement and fix the ones that drifted. Returns the number of courses
+    corrected, or None if another reconciliation is already running.
+    Does not commit; the locks are held until the caller does.
+    """
+    if not await db.scalar(select(func.pg_try_advisory_xact_lock(RECONCILE_LOCK_ID))):
+        return None
+    # Lock the course rows first, in their own statement: in-flight bump_course
+    # transactions finish before we get them, new ones wait for our commit, and
+    # the UPDATE below then starts with a snapshot that includes every bump
+    await db.execute(select(Course.id).order_by(Course.id).with_for_update())
+
+    enrollments = (
+        select(Enrollment.course_id, func.count().label("n"))
+        .group_by(Enrollment.course_id)
+        .subquery()
+    )
+    modules = (
+        select(Module.course_id, func.count().label("n"))
+        .group_by(Module.course_id)
+        .subquery()
+    )
+    videos = (
+        select(
+            Module.course_id,
+            func.count(Video.id).label("n"),
+            func.coalesce(func.sum(Video.duration), 0).label("duration"),
+        )
+        .join(Video, Video.module_id == Module.id)
+        .group_by(Module.course_id)
+        .subquery()
+    )
+    actual = (
+        select(
+            Course.id.label("course_id"),
+            func.coalesce(enrollments.c.n, 0).label("enrollment_count"),
+            func.coalesce(modules.c.n, 0).label("module_count"),
+            func.coalesce(videos.c.n, 0).label("video_count"),
+            func.coalesce(videos.c.duration, 0).label("total_duration"),
+        )
+        .outerjoin(enrollments, enrollments.c.course_id == Course.id)
+        .outerjoin(modules, modules.c.course_id == Course.id)
+        .outerjoin(videos, videos.c.course_id == Course.id)
+        .subquery()
+    )
+    columns = ["enrollment_count", "module_count", "video_count", "total_duration"]
+    result = await db.execute(
+        update(Course)
+        .where(
+            Course.id == actual.c.course_id,
+            or_(*[getattr(Course, c).is_distinct_from(actual.c[c]) for c in columns]),
+        )
+        .values(updated_at=Course.updated_at, **{c: actual.c[c] for c in columns})
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+async def _main():
+    from app.db.session import AsyncSessionLocal
+    from app.models import user  # noqa: F401  Registers User for the relationship mappers
+    async with AsyncSessionLocal() as db:
+        corrected = await reconcile_course_aggregates(db)
+        await db.commit()
+    if corrected is None:
+        print("Reconciliation already running elsewhere, skipped")
+    else:
+        print(f"Reconciled aggregates: {corrected} course(s) corrected")
+
+if __name__ == "__main__":
+    # Run periodically (e.g. nightly): python -m app.services.aggregates
+    asyncio.run(_main())
@@ -0,0 +1,197 @@
+import asyncio
+import tempfile
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.redis import get_redis
+from app.models.course import Course, Module, Video
+from app.schemas.course import CourseImport, ImportJob, ImportResult
+
+async def insert_course_trees(db: AsyncSession, courses: List[CourseImport]) -> ImportResult:
+    """
+    Insert whole course trees level by level: one batched multi-row
+    INSERT ... RETURNING for courses, one for modules, one for videos.
+    Aggregates are computed from the tree. The caller commits.
+    """
+    if not courses:
+        return ImportResult()
+
+    now = datetime.utcnow()
+    course_rows = []
+    for course in courses:
+        videos = [video for module in course.modules for video in module.videos]
+        course_rows.append({
+            "title": course.title,
+            "description": course.description,
+            "price": course.price,
+            "is_published": course.is_published,
+            "created_at": now,
+            "updated_at": now,
+            "enrollment_count": 0,
+            "module_count": len(course.modules),
+            "video_count": len(videos),
+            "total_duration": sum(video.duration or 0 for video in videos),
+        })
+    result = await db.execute(insert(Course).returning(Course.id, sort_by_parameter_order=True), course_rows)
+    course_ids = result.scalars().all()
+
+    module_rows, module_videos = [], []
+    for course_id, course in zip(course_ids, courses):
+        for module in course.modules:
+            module_rows.append({"title": module.title, "order": module.order, "course_id": course_id})
+            module_videos.append(module.videos)
+    if not module_rows:
+        return ImportResult(courses=len(course_ids), course_ids=course_ids)
+    result = await db.execute(insert(Module).returning(Module.id, sort_by_parameter_order=True), module_rows)
+    module_ids = result.scalars().all()
+
+    video_rows = [
+        {
+            "title": video.title,
+            "description": video.description,
+            "url": video.url,
+            "duration": video.duration or 0,
+            "module_id": module_id,
+        }
+        for module_id, videos in zip(module_ids, module_videos)
+        for video in videos
+    ]
+    if video_rows:
+        await db.execute(insert(Video), video_rows)
+
+    return ImportResult(
+        courses=len(course_ids), modules=len(module_ids), videos=len(video_rows), course_ids=course_ids
+    )
+
+# NDJSON imports: the upload is spooled to disk, validated in full, then
+# imported by a background job whose progress can be polled.
+
+# Local copies are only a fallback for when Redis is unavailable; keep the newest
+_jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+MAX_LOCAL_JOBS = 1000
+JOB_TTL_SECONDS = 24 * 3600
+
+class UploadTooLarge(Exception):
+    pass
+
+async def save_job(job: ImportJob):
+    _jobs[job.id] = job
+    _jobs.move_to_end(job.id)
+    while len(_jobs) > MAX_LOCAL_JOBS:
+        _jobs.popitem(last=False)
+    # Mirror to Redis so any worker can answer progress queries
+    redis = get_redis()
+    if redis is not None:
+        try:
+            await redis.set(f"import:job:{job.id}", job.model_dump_json(), ex=JOB_TTL_SECONDS)
+        except Exception:
+            pass
+
+async def get_job(job_id: str) -> Optional[ImportJob]:
+    redis = get_redis()
+    if redis is not None:
+        try:
+            data = await redis.get(f"import:job:{job_id}")
+            if data:
+                return ImportJob.model_validate_json(data)
+        except Exception:
+            pass
+    return _jobs.get(job_id)
+
+async def spool_upload(chunks: AsyncIterator[bytes], max_bytes: int, write_size: int = 1 << 20) -> Path:
+    """
+    Write a streamed body to a temp file, off the event loop in writes of
+    about `write_size`. Past `max_bytes` it raises UploadTooLarge and removes
+    what was written.
+    """
+    spool = tempfile.NamedTemporaryFile(prefix="course-import-", suffix=".ndjson", delete=False)
+    path = Path(spool.name)
+    try:
+        pending: List[bytes] = []
+        pending_size = total = 0
+        async for chunk in chunks:
+            total += len(chunk)
+            if total > max_bytes:
+                raise UploadTooLarge(f"Import exceeds {max_bytes} bytes")
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size >= write_size:
+                await asyncio.to_thread(spool.write, b"".join(pending))
+                pending, pending_size = [], 0
+        if pending:
+            await asyncio.to_thread(spool.write, b"".join(pending))
+        await asyncio.to_thread(spool.close)
+    except BaseException:
+        spool.close()
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+def validate_ndjson(path: Path) -> Tuple[int, Optional[str]]:
+    """Parse every line before anything is written. Returns (courses, error)."""
+    count = 0
+    with open(path, "rb") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                CourseImport.model_validate_json(line)
+            except ValidationError as e:
+                first = e.errors()[0]
+                location = ".".join(str(part) for part in first["loc"])
+                return count, f"line {number}: {location}: {first['msg']}"
+            count += 1
+    return count, None
+
+async def run_ndjson_import(job_id: str, path: Path, batch_size: int = 200):
+    """
+    Background job: validate the whole file, then import it in batches inside
+    a single transaction, recording progress after every batch.
+    """
+    from app.db.session import AsyncSessionLocal
+
+    job = ImportJob(id=job_id, status="validating")
+    try:
+        await save_job(job)
+        job.total_courses, error = await asyncio.to_thread(validate_ndjson, path)
+        if error:
+            job.status, job.error = "failed", error
+            return
+
+        job.status = "importing"
+        await save_job(job)
+        async with AsyncSessionLocal() as db:
+            batch: List[CourseImport] = []
+            with open(path, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        batch.append(CourseImport.model_validate_json(line))
+                    if len(batch) >= batch_size:
+                        await _import_batch(db, batch, job)
+                        batch = []
+            await _import_batch(db, batch, job)
+            await db.commit()
+        job.status = "done"
+    except Exception as e:
+        job.status, job.error = "failed", str(e)
+        print(f"Course import error (job {job_id}): {e}")
+    finally:
+        await save_job(job)
+        path.unlink(missing_ok=True)
+
+async def _import_batch(db: AsyncSession, batch: List[CourseImport], job: ImportJob):
+    if not batch:
+        return
+    result = await insert_course_trees(db, batch)
+    job.courses += result.courses
+    job.modules += result.modules
+    job.videos += result.videos
+    await save_job(job)
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
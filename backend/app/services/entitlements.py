@@ -0,0 +1,206 @@
+import asyncio
+import base64
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from sqlalchemy import select
+from app.db.redis import get_redis
+
+INVALIDATION_CHANNEL = "entitlements:invalidate"
+
+class EntitlementService:
+    """
+    Answers "may user U access course C / video V" without a query on the
+    hot path. Each user's enrolled course ids are kept as a sorted int array
+    (4 bytes per course) and checked by binary search:
+
+    - in-process LRU of `capacity` users, entries trusted for `local_ttl`
+    - Redis tier shared by all workers, packed arrays kept for `redis_ttl`
+    - database on a miss in both
+
+    Enrollment inserts call invalidate() after committing. It writes the
+    fresh array through to Redis and, via pub/sub, evicts the user from every
+    worker's LRU. Readers only fill Redis when the key is absent, so a read
+    that raced the enrollment cannot replace the fresh array with a stale one.
+    """
+    def __init__(self, capacity: int = 50_000, local_ttl: float = 60.0, redis_ttl: int = 3600, miss_ttl: float = 30.0):
+        self.capacity = capacity
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self.miss_ttl = miss_ttl
+        self._lru: "OrderedDict[int, Tuple[float, array]]" = OrderedDict()
+        self._invalidated: Dict[int, float] = {}  # user id -> when; reads that started earlier are not cached
+        # Precomputed at startup; videos added since are resolved on first access and cached
+        self.video_course: Dict[int, int] = {}
+        self.asset_video: Dict[str, int] = {}  # Static path of an original upload -> video id
+        # Paths and ids with no video, so unknown URLs do not cost a query each
+        self._missing: "OrderedDict[object, float]" = OrderedDict()
+
+    @staticmethod
+    def _redis_key(user_id: int) -> str:
+        return f"ent:u:{user_id}"
+
+    async def course_ids(self, user_id: int) -> array:
+        entry = self._lru.get(user_id)
+        now = time.monotonic()
+        if entry is not None and now - entry[0] < self.local_ttl:
+            self._lru.move_to_end(user_id)
+            return entry[1]
+
+        courses = await self._load_from_redis(user_id)
+        if courses is None:
+            courses = await self._load_from_db(user_id)
+            await self._store_in_redis(user_id, courses, overwrite=False)
+
+        if self._invalidated.get(user_id, 0.0) < now:
+            self._remember(user_id, courses, now)
+        return courses
+
+    def _remember(self, user_id: int, courses: array, now: float):
+        self._lru[user_id] = (now, courses)
+        self._lru.move_to_end(user_id)
+        if len(self._lru) > self.capacity:
+            self._lru.popitem(last=False)
+
+    async def can_access_course(self, user_id: int, course_id: int) -> bool:
+        courses = await self.course_ids(user_id)
+        i = bisect_left(courses, course_id)
+        return i < len(courses) and courses[i] == course_id
+
+    async def can_access_video(self, user_id: int, video_id: int) -> bool:
+        course_id = self.video_course.get(video_id)
+        if course_id is None:
+            course_id = await self._resolve_video(video_id=video_id)
+        return course_id is not None and await self.can_access_course(user_id, course_id)
+
+    async def can_access_asset(self, user_id: int, path: str) -> bool:
+        video_id = await self.video_of_asset(path)
+        return video_id is not None and await self.can_access_video(user_id, video_id)
+
+    async def video_of_asset(self, path: str) -> Optional[int]:
+        """Static path under /static: an original upload or hls/<video_id>/..."""
+        parts = path.split("/")
+        if parts[0] == "hls" and len(parts) > 1 and parts[1].isdigit():
+            return int(parts[1])
+        video_id = self.asset_video.get(path)
+        if video_id is None:
+            video_id = await self._resolve_video(url=f"/static/{path}")
+        return video_id
+
+    def register_video(self, video_id: int, course_id: int, url: str):
+        self.video_course[video_id] = course_id
+        if url.startswith("/static/"):
+            self.asset_video[url[len("/static/"):]] = video_id
+
+    async def invalidate(self, user_id: int):
+        """Call after committing an enrollment change for the user."""
+        now = time.monotonic()
+        self._forget(user_id, now)
+        courses = await self._load_from_db(user_id)
+        self._remember(user_id, courses, now)
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await self._store_in_redis(user_id, courses, overwrite=True, strict=True)
+            await redis.publish(INVALIDATION_CHANNEL, user_id)
+        except Exception as e:
+            print(f"Entitlement invalidation warning: {e}")
+
+    def _forget(self, user_id: int, now: float):
+        self._lru.pop(user_id, None)
+        self._invalidated[user_id] = now
+        if len(self._invalidated) > 10_000:
+            # Only reads still in flight care; anything older than the local TTL is moot
+            self._invalidated = {u: t for u, t in self._invalidated.items() if now - t < self.local_ttl}
+
+    async def listen_for_invalidations(self):
+        redis = get_redis()
+        if redis is None:
+            return
+        while True:
+            try:
+                pubsub = redis.pubsub()
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._forget(int(message["data"]), time.monotonic())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Local TTL bounds staleness while we reconnect
+                print(f"Entitlement listener error: {e}")
+                await asyncio.sleep(5)
+
+    async def load_video_map(self):
+        from app.db.session import AsyncSessionLocal
+        from app.models.course import Module, Video
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(Video.id, Module.course_id, Video.url).join(Module))
+            for video_id, course_id, url in result.all():
+                self.register_video(video_id, course_id, url)
+
+    async def _resolve_video(self, video_id: Optional[int] = None, url: Optional[str] = None) -> Optional[int]:
+        """Look up a video missing from the map (e.g. uploaded via another worker) and cache it."""
+        from app.db.session import AsyncSessionLocal
+        from app.models.course import Module, Video
+
+        key = video_id if video_id is not None else url
+        now = time.monotonic()
+        if self._missing.get(key, 0.0) > now:
+            return None
+
+        query = select(Video.id, Module.course_id, Video.url).join(Module)
+        query = query.where(Video.id == video_id) if video_id is not None else query.where(Video.url == url)
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(query)).first()
+        if row is None:
+            self._missing[key] = now + self.miss_ttl
+            self._missing.move_to_end(key)
+            if len(self._missing) > self.capacity:
+                self._missing.popitem(last=False)
+            return None
+        self.register_video(*row)
+        return row.course_id if video_id is not None else row.id
+
+    async def _load_from_db(self, user_id: int) -> array:
+        from app.db.session import AsyncSessionLocal
+        from app.models.enrollment import Enrollment
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Enrollment.course_id).where(Enrollment.user_id == user_id).distinct()
+            )
+            return array("i", sorted(result.scalars().all()))
+
+    async def _load_from_redis(self, user_id: int) -> Optional[array]:
+        redis = get_redis()
+        if redis is None:
+            return None
+        try:
+            packed = await redis.get(self._redis_key(user_id))
+        except Exception:
+            return None
+        if packed is None:
+            return None
+        courses = array("i")
+        courses.frombytes(base64.b64decode(packed))
+        return courses
+
+    async def _store_in_redis(self, user_id: int, courses: array, overwrite: bool, strict: bool = False):
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            await redis.set(
+                self._redis_key(user_id), base64.b64encode(courses.tobytes()).decode(),
+                ex=self.redis_ttl, nx=not overwrite,
+            )
+        except Exception:
+            if strict:
+                raise
+
+entitlement_service = EntitlementService()
@@ -0,0 +1,277 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from sqlalchemy import select, update, bindparam, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.db.redis import get_redis
+
+# (user_id, video_id, position, completed)
+ProgressEntry = Tuple[int, int, int, bool]
+
+class ProgressBuffer(ABC):
+    """
+    Coalesces heartbeats until the next flush. Last write wins for the
+    position; completion is sticky once reported.
+    """
+    @abstractmethod
+    async def record(self, user_id: int, video_id: int, position: int, completed: bool):
+        pass
+
+    @abstractmethod
+    async def pending_for_user(self, user_id: int) -> Dict[int, Tuple[int, bool]]:
+        pass
+
+    @abstractmethod
+    async def drain(self, max_users: int) -> List[ProgressEntry]:
+        """Remove and return pending entries for up to `max_users` users."""
+        pass
+
+    @abstractmethod
+    async def requeue(self, entries: List[ProgressEntry]):
+        """Put back entries whose flush failed, unless newer ones arrived meanwhile."""
+        pass
+
+class InMemoryProgressBuffer(ProgressBuffer):
+    def __init__(self):
+        self._pending: Dict[int, Dict[int, Tuple[int, bool]]] = {}
+
+    async def record(self, user_id: int, video_id: int, position: int, completed: bool):
+        videos = self._pending.setdefault(user_id, {})
+        previous = videos.get(video_id)
+        videos[video_id] = (position, completed or (previous is not None and previous[1]))
+
+    async def pending_for_user(self, user_id: int) -> Dict[int, Tuple[int, bool]]:
+        return dict(self._pending.get(user_id, {}))
+
+    async def drain(self, max_users: int) -> List[ProgressEntry]:
+        entries = []
+        for user_id in list(self._pending)[:max_users]:
+            for video_id, (position, completed) in self._pending.pop(user_id).items():
+                entries.append((user_id, video_id, position, completed))
+        return entries
+
+    async def requeue(self, entries: List[ProgressEntry]):
+        for user_id, video_id, position, completed in entries:
+            videos = self._pending.setdefault(user_id, {})
+            if video_id in videos:
+                newer_position, newer_completed = videos[video_id]
+                videos[video_id] = (newer_position, newer_completed or completed)
+            else:
+                videos[video_id] = (position, completed)
+
+class RedisProgressBuffer(ProgressBuffer):
+    """
+    One hash per user (field <video_id> = position, <video_id>:c = 1 once
+    completed) plus a set of users with pending writes. Shared by all workers,
+    so any of them can flush.
+
+    When Redis fails, heartbeats go to this worker's in-memory buffer and
+    Redis is skipped for `cooldown` seconds. Flushes drain both.
+    """
+    DIRTY_KEY = "progress:dirty"
+
+    def __init__(self, redis: aioredis.Redis, fallback: Optional[ProgressBuffer] = None, cooldown: float = 5.0):
+        self.redis = redis
+        self.fallback = fallback or InMemoryProgressBuffer()
+        self.cooldown = cooldown
+        self._down_until = 0.0
+
+    @staticmethod
+    def _user_key(user_id: int) -> str:
+        return f"progress:u:{user_id}"
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _unavailable(self, error: RedisError):
+        print(f"Progress buffer warning: Redis unavailable, buffering in memory ({error})")
+        self._down_until = time.monotonic() + self.cooldown
+
+    async def record(self, user_id: int, video_id: int, position: int, completed: bool):
+        if self._available():
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    pipe.hset(self._user_key(user_id), str(video_id), position)
+                    if completed:
+                        pipe.hset(self._user_key(user_id), f"{video_id}:c", 1)
+                    pipe.sadd(self.DIRTY_KEY, user_id)
+                    await pipe.execute()
+                return
+            except RedisError as e:
+                self._unavailable(e)
+        await self.fallback.record(user_id, video_id, position, completed)
+
+    async def pending_for_user(self, user_id: int) -> Dict[int, Tuple[int, bool]]:
+        pending: Dict[int, Tuple[int, bool]] = {}
+        if self._available():
+            try:
+                pending = self._parse(await self.redis.hgetall(self._user_key(user_id)))
+            except RedisError as e:
+                self._unavailable(e)
+        # Anything buffered locally was recorded during an outage, so it is newer
+        for video_id, (position, completed) in (await self.fallback.pending_for_user(user_id)).items():
+            previous = pending.get(video_id)
+            pending[video_id] = (position, completed or (previous is not None and previous[1]))
+        return pending
+
+    async def drain(self, max_users: int) -> List[ProgressEntry]:
+        # Redis first: entries buffered locally are newer and must be written last
+        if self._available():
+            try:
+                entries = await self._drain_redis(max_users)
+                if entries:
+                    return entries
+            except RedisError as e:
+                self._unavailable(e)
+        return await self.fallback.drain(max_users)
+
+    async def _drain_redis(self, max_users: int) -> List[ProgressEntry]:
+        user_ids = await self.redis.spop(self.DIRTY_KEY, max_users)
+        if not user_ids:
+            return []
+        # Read and delete atomically so heartbeats landing mid-drain are not lost
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for user_id in user_ids:
+                pipe.hgetall(self._user_key(user_id))
+                pipe.delete(self._user_key(user_id))
+            results = await pipe.execute()
+
+        entries = []
+        for user_id, fields in zip(user_ids, results[::2]):
+            for video_id, (position, completed) in self._parse(fields).items():
+                entries.append((int(user_id), video_id, position, completed))
+        return entries
+
+    async def requeue(self, entries: List[ProgressEntry]):
+        if self._available():
+            try:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for user_id, video_id, position, completed in entries:
+                        pipe.hsetnx(self._user_key(user_id), str(video_id), position)
+                        if completed:
+                            pipe.hset(self._user_key(user_id), f"{video_id}:c", 1)
+                        pipe.sadd(self.DIRTY_KEY, user_id)
+                    await pipe.execute()
+                return
+            except RedisError as e:
+                self._unavailable(e)
+        await self.fallback.requeue(entries)
+
+    @staticmethod
+    def _parse(fields: Dict[str, str]) -> Dict[int, Tuple[int, bool]]:
+        return {
+            int(field): (int(value), f"{field}:c" in fields)
+            for field, value in fields.items()
+            if not field.endswith(":c")
+        }
+
+class ProgressService:
+    def __init__(self, batch_users: int = 500, chunk_size: int = 1000):
+        self.batch_users = batch_users
+        self.chunk_size = chunk_size
+        self._buffer: Optional[ProgressBuffer] = None
+
+    @property
+    def buffer(self) -> ProgressBuffer:
+        if self._buffer is None:
+            redis = get_redis()
+            self._buffer = RedisProgressBuffer(redis) if redis is not None else InMemoryProgressBuffer()
+        return self._buffer
+
+    async def record_heartbeat(self, user_id: int, video_id: int, position: int, completed: bool = False):
+        await self.buffer.record(user_id, video_id, position, completed)
+
+    async def pending_for_user(self, user_id: int) -> Dict[int, Tuple[int, bool]]:
+        return await self.buffer.pending_for_user(user_id)
+
+    async def flush(self) -> int:
+        """Persist everything buffered so far. Returns the number of rows written."""
+        written = 0
+        while True:
+            entries = await self.buffer.drain(self.batch_users)
+            if not entries:
+                return written
+            try:
+                written += await self._persist(entries)
+            except BaseException:
+                # Including cancellation at shutdown: drained entries must not be lost.
+                # Upserts and the completion flip are idempotent, so a replay is safe.
+                await self.buffer.requeue(entries)
+                raise
+
+    async def run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Progress flush error: {e}")
+
+    async def _persist(self, entries: List[ProgressEntry]) -> int:
+        from app.db.session import AsyncSessionLocal
+        from app.models.course import Module, Video
+        from app.models.enrollment import Enrollment
+        from app.models.progress import VideoProgress
+
+        async with AsyncSessionLocal() as db:
+            # One lookup serves both to drop heartbeats for unknown videos and
+            # to attribute completions to courses
+            video_ids = {video_id for _, video_id, _, _ in entries}
+            result = await db.execute(
+                select(Video.id, Module.course_id).join(Module).where(Video.id.in_(video_ids))
+            )
+            video_course = dict(result.all())
+            entries = [entry for entry in entries if entry[1] in video_course]
+            if not entries:
+                return 0
+
+            now = datetime.utcnow()
+            rows = [
+                {"user_id": u, "video_id": v, "position": p, "completed": False, "updated_at": now}
+                for u, v, p, _ in entries
+            ]
+            for start in range(0, len(rows), self.chunk_size):
+                stmt = pg_insert(VideoProgress).values(rows[start:start + self.chunk_size])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[VideoProgress.user_id, VideoProgress.video_id],
+                    set_={"position": stmt.excluded.position, "updated_at": stmt.excluded.updated_at},
+                )
+                await db.execute(stmt)
+
+            # Flip completion with a conditional UPDATE: the row lock guarantees
+            # each video is counted once even when several workers flush at once
+            completed = [(u, v) for u, v, _, c in entries if c]
+            newly_completed = []
+            for start in range(0, len(completed), self.chunk_size):
+                result = await db.execute(
+                    update(VideoProgress)
+                    .where(
+                        tuple_(VideoProgress.user_id, VideoProgress.video_id).in_(completed[start:start + self.chunk_size]),
+                        VideoProgress.completed == False,
+                    )
+                    .values(completed=True)
+                    .returning(VideoProgress.user_id, VideoProgress.video_id)
+                    .execution_options(synchronize_session=False)
+                )
+                newly_completed.extend(result.all())
+
+            if newly_completed:
+                per_course = Counter((u, video_course[v]) for u, v in newly_completed)
+                enrollments = Enrollment.__table__
+                conn = await db.connection()
+                await conn.execute(
+                    enrollments.update()
+                    .where(enrollments.c.user_id == bindparam("u"), enrollments.c.course_id == bindparam("c"))
+                    .values(completed_videos=enrollments.c.completed_videos + bindparam("n")),
+                    [{"u": u, "c": c, "n": n} for (u, c), n in per_course.items()],
+                )
+
+            await db.commit()
+            return len(rows)
+
+progress_service = ProgressService()
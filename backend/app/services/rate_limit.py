@@ -0,0 +1,141 @@
+import math
+import re
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from app.db.redis import get_redis
+
+@dataclass(frozen=True)
+class RatePolicy:
+    name: str
+    limit: int   # Requests allowed per window
+    window: int  # Window length in seconds
+
+# Per-route policies, keyed on client address. Checked in order, first match wins.
+ROUTE_POLICIES: List[Tuple[str, "re.Pattern[str]", RatePolicy]] = [
+    ("POST", re.compile(r"^/api/v1/auth/login/?$"), RatePolicy("login", limit=10, window=60)),
+    ("POST", re.compile(r"^/api/v1/auth/signup/?$"), RatePolicy("signup", limit=5, window=600)),
+    ("POST", re.compile(r"^/api/v1/payments/create-checkout-session/\d+/?$"), RatePolicy("checkout", limit=10, window=60)),
+    ("POST", re.compile(r"^/api/v1/courses/\d+/videos/?$"), RatePolicy("upload", limit=20, window=3600)),
+    ("POST", re.compile(r"^/api/v1/courses/import(/ndjson)?/?$"), RatePolicy("import", limit=10, window=3600)),
+]
+
+_policies_by_name = {policy.name: policy for _, _, policy in ROUTE_POLICIES}
+
+def match_policy(method: str, path: str) -> Optional[RatePolicy]:
+    for policy_method, pattern, policy in ROUTE_POLICIES:
+        if method == policy_method and pattern.match(path):
+            return policy
+    return None
+
+def _window_position(policy: RatePolicy, now: float) -> Tuple[int, float]:
+    """
+    Returns the index of the current window and the weight still carried by the
+    previous window under the sliding-window approximation.
+    """
+    index = int(now // policy.window)
+    elapsed = now - index * policy.window
+    return index, (policy.window - elapsed) / policy.window
+
+class RateLimiter(ABC):
+    @abstractmethod
+    async def hit(self, key: str, policy: RatePolicy) -> float:
+        """
+        Count one request for `key`. Returns 0 when it is allowed, otherwise
+        the number of seconds the client should wait before retrying.
+        """
+        pass
+
+class InMemoryRateLimiter(RateLimiter):
+    """
+    Per-process sliding-window counters. Used when Redis is not configured or
+    unreachable; limits are then enforced per worker rather than globally.
+    """
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> [window index, current count, previous count]
+        self._buckets: Dict[str, List[int]] = {}
+
+    async def hit(self, key: str, policy: RatePolicy) -> float:
+        now = time.time()
+        index, weight = _window_position(policy, now)
+        bucket_key = f"{policy.name}:{key}"
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None or bucket[0] < index - 1:
+            bucket = [index, 0, 0]
+        elif bucket[0] == index - 1:
+            bucket = [index, 0, bucket[1]]
+
+        if bucket[2] * weight + bucket[1] >= policy.limit:
+            self._buckets[bucket_key] = bucket
+            return policy.window * weight
+
+        bucket[1] += 1
+        self._buckets[bucket_key] = bucket
+        if len(self._buckets) > self.max_keys:
+            self._evict(now)
+        return 0
+
+    def _evict(self, now: float):
+        # Drop buckets that no longer contribute to any sliding window
+        for bucket_key in list(self._buckets):
+            policy = _policies_by_name.get(bucket_key.split(":", 1)[0])
+            window = policy.window if policy else 3600
+            if self._buckets[bucket_key][0] < int(now // window) - 1:
+                del self._buckets[bucket_key]
+
+# Check and increment in one round trip so concurrent workers cannot overshoot the limit
+_SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[1]) + current >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+class RedisRateLimiter(RateLimiter):
+    def __init__(self, redis: aioredis.Redis, fallback: Optional[RateLimiter] = None, cooldown: float = 5.0):
+        self.redis = redis
+        self.fallback = fallback or InMemoryRateLimiter()
+        self.cooldown = cooldown
+        self._script = redis.register_script(_SLIDING_WINDOW_SCRIPT)
+        self._down_until = 0.0
+
+    async def hit(self, key: str, policy: RatePolicy) -> float:
+        now = time.time()
+        # While Redis is down, skip it entirely instead of paying a timeout per request
+        if now < self._down_until:
+            return await self.fallback.hit(key, policy)
+
+        index, weight = _window_position(policy, now)
+        # Hash tag keeps both windows in the same cluster slot
+        prefix = f"rl:{{{policy.name}:{key}}}"
+        try:
+            allowed = await self._script(
+                keys=[f"{prefix}:{index}", f"{prefix}:{index - 1}"],
+                args=[weight, policy.limit, policy.window * 2],
+            )
+        except RedisError as e:
+            print(f"Rate limiter warning: Redis unavailable, using in-memory limits ({e})")
+            self._down_until = now + self.cooldown
+            return await self.fallback.hit(key, policy)
+        return 0 if allowed else policy.window * weight
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+# Factory or Singleton
+_rate_limiter: Optional[RateLimiter] = None
+
+def get_rate_limiter() -> RateLimiter:
+    global _rate_limiter
+    if _rate_limiter is None:
+        redis = get_redis()
+        _rate_limiter = RedisRateLimiter(redis) if redis is not None else InMemoryRateLimiter()
+    return _rate_limiter
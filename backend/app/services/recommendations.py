@@ -0,0 +1,244 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from scipy import sparse
+
+def _without_diagonal(m: sparse.spmatrix) -> sparse.csr_matrix:
+    coo = m.tocoo()
+    keep = coo.row != coo.col
+    return sparse.csr_matrix((coo.data[keep], (coo.row[keep], coo.col[keep])), shape=m.shape)
+
+def _binary(rows: np.ndarray, cols: np.ndarray, shape: Tuple[int, int]) -> sparse.csr_matrix:
+    m = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=shape)
+    m.sum_duplicates()
+    m.data[:] = 1  # Duplicate enrollments count once
+    return m
+
+class CoOccurrenceIndex:
+    """
+    "Learners also enrolled in" index over the user x course enrollment graph.
+
+    X is the binary user x course matrix and C = X^T X the course
+    co-occurrence counts. Neighbours are ranked by cosine similarity,
+    C_ij / sqrt(n_i n_j), and the top k per course are precomputed into two
+    dense (n_courses, k) arrays, which is all that serving touches.
+    """
+    def __init__(self, k: int = 20, min_support: int = 2):
+        self.k = k
+        self.min_support = min_support  # Minimum shared learners for a pair to count
+        self.course_ids = np.empty(0, dtype=np.int64)
+        self.course_index: Dict[int, int] = {}
+        self.user_index: Dict[int, int] = {}
+        self.enrollments = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self.cooccurrence = sparse.csr_matrix((0, 0), dtype=np.int32)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.top_ids = np.empty((0, k), dtype=np.int32)
+        self.top_scores = np.empty((0, k), dtype=np.float32)
+        self.high_water = 0  # Largest enrollment id included
+
+    @classmethod
+    def build(cls, user_ids: np.ndarray, course_ids: np.ndarray, high_water: int = 0, **kwargs) -> "CoOccurrenceIndex":
+        index = cls(**kwargs)
+        index.course_ids, course_pos = np.unique(course_ids, return_inverse=True)
+        users, user_pos = np.unique(user_ids, return_inverse=True)
+        index.course_index = {int(c): i for i, c in enumerate(index.course_ids)}
+        index.user_index = {int(u): i for i, u in enumerate(users)}
+
+        index.enrollments = _binary(user_pos, course_pos, (len(users), len(index.course_ids)))
+        full = (index.enrollments.T @ index.enrollments).tocsr()
+        index.counts = full.diagonal().astype(np.int64)
+        index.cooccurrence = _without_diagonal(full)
+        index.top_ids, index.top_scores = index._top_k(np.arange(len(index.course_ids)))
+        index.high_water = high_water
+        return index
+
+    def add(self, user_ids: np.ndarray, course_ids: np.ndarray, high_water: int):
+        """
+        Fold new enrollments in. With E the new entries of X:
+        C' = C + E^T X + X^T E + E^T E, and only courses whose row of C
+        changed get their top k recomputed. Neighbours of those courses keep
+        slightly stale normalisation until the next full build.
+        """
+        for course_id in np.unique(course_ids):
+            if int(course_id) not in self.course_index:
+                self.course_index[int(course_id)] = len(self.course_index)
+        for user_id in np.unique(user_ids):
+            if int(user_id) not in self.user_index:
+                self.user_index[int(user_id)] = len(self.user_index)
+
+        n_courses, n_users = len(self.course_index), len(self.user_index)
+        grown = n_courses - len(self.course_ids)
+        if grown:
+            self.course_ids = np.concatenate([
+                self.course_ids,
+                np.array(list(self.course_index)[-grown:], dtype=np.int64),
+            ])
+            self.counts = np.concatenate([self.counts, np.zeros(grown, dtype=np.int64)])
+            self.top_ids = np.vstack([self.top_ids, np.full((grown, self.k), -1, dtype=np.int32)])
+            self.top_scores = np.vstack([self.top_scores, np.zeros((grown, self.k), dtype=np.float32)])
+        self.enrollments.resize((n_users, n_courses))
+        self.cooccurrence.resize((n_courses, n_courses))
+        self.high_water = max(self.high_water, high_water)
+
+        rows = np.fromiter((self.user_index[int(u)] for u in user_ids), dtype=np.int64, count=len(user_ids))
+        cols = np.fromiter((self.course_index[int(c)] for c in course_ids), dtype=np.int64, count=len(course_ids))
+        new = _binary(rows, cols, (n_users, n_courses))
+        new = new - new.multiply(self.enrollments)  # Drop pairs already indexed
+        new.eliminate_zeros()
+        if new.nnz == 0:
+            return
+
+        cross = (new.T @ self.enrollments).tocsr()
+        delta = cross + cross.T + (new.T @ new)
+        self.counts += delta.diagonal().astype(np.int64)
+        delta = _without_diagonal(delta)
+        self.enrollments = (self.enrollments + new).tocsr()
+        self.cooccurrence = (self.cooccurrence + delta).tocsr()
+
+        changed = np.unique(np.concatenate([delta.tocoo().row, np.unique(cols)]))
+        self.top_ids[changed], self.top_scores[changed] = self._top_k(changed)
+
+    def copy(self) -> "CoOccurrenceIndex":
+        clone = CoOccurrenceIndex(k=self.k, min_support=self.min_support)
+        clone.course_ids = self.course_ids.copy()
+        clone.course_index = dict(self.course_index)
+        clone.user_index = dict(self.user_index)
+        clone.enrollments = self.enrollments.copy()
+        clone.cooccurrence = self.cooccurrence.copy()
+        clone.counts = self.counts.copy()
+        clone.top_ids = self.top_ids.copy()
+        clone.top_scores = self.top_scores.copy()
+        clone.high_water = self.high_water
+        return clone
+
+    def _top_k(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        sub = self.cooccurrence[rows]
+        row_of = np.repeat(np.arange(len(rows)), np.diff(sub.indptr))
+        support = sub.data
+        scores = (support / np.sqrt(self.counts[rows][row_of] * self.counts[sub.indices])).astype(np.float32)
+        scores[support < self.min_support] = 0
+
+        # Sort by row, then by descending score; rank within row is the offset from the row start
+        order = np.lexsort((-scores, row_of))
+        ranked_rows = row_of[order]
+        rank = np.arange(len(order)) - sub.indptr[ranked_rows]
+        keep = (rank < self.k) & (scores[order] > 0)
+
+        top_ids = np.full((len(rows), self.k), -1, dtype=np.int32)
+        top_scores = np.zeros((len(rows), self.k), dtype=np.float32)
+        top_ids[ranked_rows[keep], rank[keep]] = sub.indices[order][keep]
+        top_scores[ranked_rows[keep], rank[keep]] = scores[order][keep]
+        return top_ids, top_scores
+
+    def related(self, course_id: int, limit: int = 10) -> List[Tuple[int, float]]:
+        position = self.course_index.get(course_id)
+        if position is None:
+            return []
+        ids, scores = self.top_ids[position, :limit], self.top_scores[position, :limit]
+        valid = ids >= 0
+        return list(zip(self.course_ids[ids[valid]].tolist(), scores[valid].tolist()))
+
+    def for_user(self, user_id: int, limit: int = 10) -> List[Tuple[int, float]]:
+        """Sum the similarity lists of the user's courses, excluding what they already have."""
+        position = self.user_index.get(user_id)
+        if position is None:
+            return []
+        row = self.enrollments[position]
+        owned = row.indices
+        if len(owned) == 0:
+            return []
+        candidates = self.top_ids[owned].ravel()
+        weights = self.top_scores[owned].ravel()
+        valid = (candidates >= 0) & ~np.isin(candidates, owned)
+        if not valid.any():
+            return []
+        unique, inverse = np.unique(candidates[valid], return_inverse=True)
+        totals = np.bincount(inverse, weights=weights[valid])
+        best = np.argsort(-totals, kind="stable")[:limit]
+        return list(zip(self.course_ids[unique[best]].tolist(), totals[best].tolist()))
+
+def _with_enrollments(index: CoOccurrenceIndex, user_ids: np.ndarray, course_ids: np.ndarray, high_water: int) -> CoOccurrenceIndex:
+    updated = index.copy()
+    updated.add(user_ids, course_ids, high_water)
+    return updated
+
+class RecommendationService:
+    """
+    Keeps a CoOccurrenceIndex in memory: built in a worker thread at
+    startup, then refreshed from enrollments newer than its high-water
+    mark, and rebuilt in full every `rebuild_every` refreshes.
+
+    Ids are assigned at insert, not commit, so a lower id can become visible
+    after a higher one. Each refresh re-reads the last `lookback` ids below
+    the mark to pick those up; add() skips pairs it has already indexed.
+    """
+    def __init__(self, k: int = 20, rebuild_every: int = 60, fetch_chunk: int = 10_000, lookback: int = 5_000):
+        self.k = k
+        self.rebuild_every = rebuild_every
+        self.fetch_chunk = fetch_chunk  # Rows per query when loading enrollments
+        self.lookback = lookback
+        self.index: Optional[CoOccurrenceIndex] = None
+        self._refreshes = 0
+
+    async def _fetch(self, after_id: int = 0) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Enrollments newer than `after_id`, read in keyset-paged chunks so the
+        event loop is never held for the whole table; conversion runs in a thread.
+        """
+        from sqlalchemy import select
+        from app.db.session import AsyncSessionLocal
+        from app.models.enrollment import Enrollment
+
+        chunks = []
+        async with AsyncSessionLocal() as db:
+            while True:
+                result = await db.execute(
+                    select(Enrollment.id, Enrollment.user_id, Enrollment.course_id)
+                    .where(Enrollment.id > after_id)
+                    .order_by(Enrollment.id)
+                    .limit(self.fetch_chunk)
+                )
+                rows = result.all()
+                if not rows:
+                    break
+                chunk = await asyncio.to_thread(np.array, rows, np.int64)
+                chunks.append(chunk)
+                after_id = int(chunk[-1, 0])
+                if len(rows) < self.fetch_chunk:
+                    break
+        if not chunks:
+            return np.empty(0, np.int64), np.empty(0, np.int64), after_id
+        data = np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+        return data[:, 1], data[:, 2], after_id
+
+    async def rebuild(self):
+        user_ids, course_ids, high_water = await self._fetch()
+        # Build off the event loop, then swap the reference so readers never see a partial index
+        self.index = await asyncio.to_thread(CoOccurrenceIndex.build, user_ids, course_ids, high_water, k=self.k)
+
+    async def refresh(self):
+        if self.index is None or self._refreshes >= self.rebuild_every:
+            self._refreshes = 0
+            await self.rebuild()
+            return
+        self._refreshes += 1
+        user_ids, course_ids, high_water = await self._fetch(max(0, self.index.high_water - self.lookback))
+        if len(user_ids):
+            # Same as rebuild: apply the delta to a copy off the loop, then swap
+            self.index = await asyncio.to_thread(_with_enrollments, self.index, user_ids, course_ids, high_water)
+
+    async def run(self, interval: float):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Recommendations refresh error: {e}")
+            await asyncio.sleep(interval)
+
+    def related(self, course_id: int, limit: int = 10) -> List[Tuple[int, float]]:
+        return self.index.related(course_id, limit) if self.index else []
+
+    def for_user(self, user_id: int, limit: int = 10) -> List[Tuple[int, float]]:
+        return self.index.for_user(user_id, limit) if self.index else []
+
+recommendation_service = RecommendationService()
@@ -1,3 +1,4 @@
+import asyncio
 import shutil
 import os
 from abc import ABC, abstractmethod
@@ -9,6 +10,11 @@ class StorageService(ABC):
     async def upload_file(self, file: UploadFile, destination: str) -> str:
         pass
 
+    @abstractmethod
+    async def upload_path(self, source: Path, destination: str) -> str:
+        """Store a file that is already on local disk (e.g. transcoder output)."""
+        pass
+
 class LocalStorage(StorageService):
     def __init__(self, upload_dir: str = "uploads"):
         self.upload_dir = Path(upload_dir)
@@ -19,12 +25,23 @@ class LocalStorage(StorageService):
         # Ensure parent directory exists for nested paths
         file_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Large uploads are copied off the event loop
+        await asyncio.to_thread(self._write, file, file_path)
         
         # Return relative path or URL
         return f"/static/{destination}"
 
+    @staticmethod
+    def _write(file: UploadFile, file_path: Path):
+        with open(file_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+
+    async def upload_path(self, source: Path, destination: str) -> str:
+        file_path = self.upload_dir / destination
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(shutil.copyfile, source, file_path)
+        return f"/static/{destination}"
+
 # Factory or Singleton
 def get_storage_service() -> StorageService:
     # In production, check settings to decide between S3 and Local
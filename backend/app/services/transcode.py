@@ -0,0 +1,269 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+from app.services.storage import StorageService
+
+SEGMENT_SECONDS = 6
+
+MAX_FPS = 30  # Lectures gain nothing from more; the H.264 levels below assume it
+
+@dataclass(frozen=True)
+class RenditionSpec:
+    name: str
+    height: int
+    video_kbps: int
+    audio_kbps: int
+    level: int = 31  # H.264 level_idc (31 = 3.1), enforced on encode and advertised in CODECS
+
+    @property
+    def codec(self) -> str:
+        # RFC 6381: avc1.<profile_idc><constraint flags><level_idc>, Main profile
+        return f"avc1.4d40{self.level:02x}"
+
+# Encoding ladder, highest first. Renditions taller than the source are skipped.
+# Levels are the lowest that fit the frame size at MAX_FPS and the bitrate.
+LADDER = [
+    RenditionSpec("1080p", 1080, 5000, 128, level=40),
+    RenditionSpec("720p", 720, 2800, 128, level=31),
+    RenditionSpec("480p", 480, 1400, 96, level=31),
+    RenditionSpec("360p", 360, 800, 96, level=30),
+]
+
+@dataclass
+class SourceInfo:
+    width: int
+    height: int
+    duration: Optional[int]
+    has_audio: bool
+
+@dataclass
+class Rendition:
+    name: str
+    width: int
+    height: int
+    bandwidth: int  # Peak bits per second, as advertised in the master playlist
+    playlist: str   # Path relative to the package root
+    codec: str = "avc1.4d401f"  # Video codec string for the master playlist
+
+@dataclass
+class HlsPackage:
+    root: Path
+    master: str = "master.m3u8"
+    duration: Optional[int] = None
+    renditions: List[Rendition] = field(default_factory=list)
+
+# Worker pool, created lazily. Each ffmpeg runs single-threaded so the pool size
+# is the real bound on CPU used for transcoding.
+_pool: Optional[ProcessPoolExecutor] = None
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def probe(source: Path) -> SourceInfo:
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error",
+            "-show_entries", "stream=codec_type,width,height:format=duration",
+            "-of", "json", str(source),
+        ],
+        capture_output=True, check=True, text=True,
+    )
+    info = json.loads(result.stdout)
+    streams = info.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    if video is None:
+        raise ValueError(f"No video stream in {source}")
+    duration = info.get("format", {}).get("duration")
+    return SourceInfo(
+        width=int(video["width"]),
+        height=int(video["height"]),
+        duration=round(float(duration)) if duration else None,
+        has_audio=any(s.get("codec_type") == "audio" for s in streams),
+    )
+
+def select_ladder(source: SourceInfo) -> List[RenditionSpec]:
+    ladder = [spec for spec in LADDER if spec.height <= source.height]
+    if not ladder:
+        # Source is smaller than our lowest rung: encode it once at its own height
+        smallest = LADDER[-1]
+        ladder = [RenditionSpec(
+            f"{source.height}p", source.height, smallest.video_kbps, smallest.audio_kbps, smallest.level
+        )]
+    return ladder
+
+def transcode_rendition(source: str, out_dir: str, spec: RenditionSpec, has_audio: bool) -> None:
+    """
+    Encode one HLS variant (playlist + segments) into out_dir. Runs in a pool
+    worker. Keyframes are forced on segment boundaries so every rendition
+    segments at the same timestamps and players can switch cleanly.
+    """
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    cmd = [
+        "ffmpeg", "-y", "-v", "error", "-i", source,
+        "-threads", "1",
+        "-vf", f"scale=-2:{spec.height}",
+        "-fpsmax", str(MAX_FPS),
+        "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "main", "-pix_fmt", "yuv420p",
+        "-level:v", f"{spec.level / 10:.1f}",
+        "-b:v", f"{spec.video_kbps}k",
+        "-maxrate", f"{int(spec.video_kbps * 1.07)}k",
+        "-bufsize", f"{spec.video_kbps * 2}k",
+        "-force_key_frames", f"expr:gte(t,n_forced*{SEGMENT_SECONDS})",
+        "-sc_threshold", "0",
+    ]
+    if has_audio:
+        cmd += ["-c:a", "aac", "-b:a", f"{spec.audio_kbps}k", "-ac", "2"]
+    else:
+        cmd += ["-an"]
+    cmd += [
+        "-f", "hls",
+        "-hls_time", str(SEGMENT_SECONDS),
+        "-hls_playlist_type", "vod",
+        "-hls_segment_filename", os.path.join(out_dir, "segment_%04d.ts"),
+        os.path.join(out_dir, "index.m3u8"),
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed for {spec.name}: {result.stderr.strip()[-500:]}")
+
+def write_master_playlist(package: HlsPackage, has_audio: bool) -> None:
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+    for rendition in package.renditions:
+        codecs = f"{rendition.codec},mp4a.40.2" if has_audio else rendition.codec
+        lines.append(
+            f"#EXT-X-STREAM-INF:BANDWIDTH={rendition.bandwidth},"
+            f"RESOLUTION={rendition.width}x{rendition.height},CODECS=\"{codecs}\""
+        )
+        lines.append(rendition.playlist)
+    (package.root / package.master).write_text("\n".join(lines) + "\n")
+
+async def package_hls(source: Path, work_dir: Path) -> HlsPackage:
+    """
+    Transcode `source` into a multi-rendition HLS package under work_dir.
+    Renditions are encoded in parallel on the process pool.
+    """
+    loop = asyncio.get_running_loop()
+    info = await loop.run_in_executor(None, probe, source)
+    ladder = select_ladder(info)
+
+    pool = get_pool()
+    await asyncio.gather(*[
+        loop.run_in_executor(
+            pool, transcode_rendition, str(source), str(work_dir / spec.name), spec, info.has_audio
+        )
+        for spec in ladder
+    ])
+
+    package = HlsPackage(root=work_dir, duration=info.duration)
+    for spec in ladder:
+        width = round(info.width * spec.height / info.height / 2) * 2
+        audio_kbps = spec.audio_kbps if info.has_audio else 0
+        package.renditions.append(Rendition(
+            name=spec.name,
+            width=width,
+            height=spec.height,
+            bandwidth=int((spec.video_kbps * 1.07 + audio_kbps) * 1000),
+            playlist=f"{spec.name}/index.m3u8",
+            codec=spec.codec,
+        ))
+    write_master_playlist(package, info.has_audio)
+    return package
+
+async def store_package(package: HlsPackage, storage: StorageService, prefix: str) -> tuple[str, List[dict]]:
+    """
+    Upload every file of the package under `prefix`, keeping the directory
+    layout so the relative URIs inside the playlists stay valid.
+    Returns the master playlist URL and per-rendition metadata.
+    """
+    master_url = None
+    playlist_urls = {}
+    for path in sorted(package.root.rglob("*")):
+        if not path.is_file():
+            continue
+        relative = path.relative_to(package.root).as_posix()
+        url = await storage.upload_path(path, f"{prefix}/{relative}")
+        if relative == package.master:
+            master_url = url
+        elif relative.endswith("index.m3u8"):
+            playlist_urls[relative] = url
+
+    renditions = [
+        {
+            "name": r.name,
+            "width": r.width,
+            "height": r.height,
+            "bandwidth": r.bandwidth,
+            "url": playlist_urls[r.playlist],
+        }
+        for r in package.renditions
+    ]
+    return master_url, renditions
+
+async def transcode_video(video_id: int, source: Path, storage: StorageService):
+    """
+    Background job run after an upload: package the source as HLS, store it
+    and record the playlist, renditions and duration on the Video row.
+    The source file is a temporary copy and is removed afterwards.
+    """
+    from app.db.session import AsyncSessionLocal
+    from app.models.course import Video
+    from app.services.aggregates import bump_course, course_of_module
+
+    work_dir = Path(tempfile.mkdtemp(prefix=f"hls-{video_id}-"))
+    try:
+        package = await package_hls(source, work_dir)
+        hls_url, renditions = await store_package(package, storage, f"hls/{video_id}")
+
+        async with AsyncSessionLocal() as db:
+            video = await db.get(Video, video_id)
+            if video is None:
+                return
+            video.hls_url = hls_url
+            video.renditions = renditions
+            if package.duration:
+                # Keep the course's total runtime in step with the probed duration
+                await bump_course(
+                    db, course_of_module(video.module_id),
+                    total_duration=package.duration - (video.duration or 0),
+                )
+                video.duration = package.duration
+            await db.commit()
+    except Exception as e:
+        print(f"Transcode Error (video {video_id}): {e}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        source.unlink(missing_ok=True)
+
+if __name__ == "__main__":
+    # Local check: python -m app.services.transcode sample.mp4 out/
+    if len(sys.argv) != 3:
+        print("Usage: python -m app.services.transcode <source> <output_dir>")
+        sys.exit(1)
+    out = Path(sys.argv[2])
+    out.mkdir(parents=True, exist_ok=True)
+    result = asyncio.run(package_hls(Path(sys.argv[1]), out))
+    shutdown_pool()
+    for r in result.renditions:
+        print(f"{r.name}: {r.width}x{r.height} @ {r.bandwidth} bps -> {r.playlist}")
+    print(f"Master playlist: {out / result.master}")
@@ -0,0 +1,60 @@
+"""
+Benchmark for the co-occurrence recommendations index on synthetic data.
+
+    python -m benchmarks.recommendations [--enrollments 1000000] [--users 200000] [--courses 5000]
+
+Course popularity is Zipf-distributed, like a real catalog. Reports the time
+for a full build, copying the index, an incremental refresh, and serving latency for
+per-course and per-user queries.
+"""
+import argparse
+import time
+import numpy as np
+from app.services.recommendations import CoOccurrenceIndex
+
+def synthetic_enrollments(n: int, users: int, courses: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    user_ids = rng.integers(1, users + 1, size=n)
+    popularity = 1.0 / np.arange(1, courses + 1) ** 1.1
+    course_ids = rng.choice(np.arange(1, courses + 1), size=n, p=popularity / popularity.sum())
+    return user_ids, course_ids
+
+def timed(label: str, fn, per: int = 1):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - start) / per
+    unit, value = ("ms", elapsed * 1e3) if elapsed >= 1e-3 else ("us", elapsed * 1e6)
+    print(f"{label:<40} {value:10.2f} {unit}")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--enrollments", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--courses", type=int, default=5_000)
+    parser.add_argument("--refresh", type=int, default=10_000, help="new enrollments per incremental refresh")
+    args = parser.parse_args()
+
+    user_ids, course_ids = synthetic_enrollments(args.enrollments, args.users, args.courses)
+    index = timed(
+        f"build ({args.enrollments:,} enrollments)",
+        lambda: CoOccurrenceIndex.build(user_ids, course_ids, high_water=args.enrollments),
+    )
+    print(f"{'co-occurrence non-zeros':<40} {index.cooccurrence.nnz:10,}")
+    print(f"{'serving index size':<40} {(index.top_ids.nbytes + index.top_scores.nbytes) / 2**20:10.2f} MB")
+
+    new_users, new_courses = synthetic_enrollments(args.refresh, args.users + 1000, args.courses, seed=1)
+    timed("copy (refresh works on a copy)", index.copy)
+    timed(
+        f"incremental refresh ({args.refresh:,} new)",
+        lambda: index.add(new_users, new_courses, high_water=args.enrollments + args.refresh),
+    )
+
+    rng = np.random.default_rng(2)
+    sample_courses = rng.integers(1, args.courses + 1, size=1000).tolist()
+    sample_users = rng.integers(1, args.users + 1, size=1000).tolist()
+    timed("related(course), per query", lambda: [index.related(c) for c in sample_courses], per=len(sample_courses))
+    timed("for_user(user), per query", lambda: [index.for_user(u) for u in sample_users], per=len(sample_users))
+
+if __name__ == "__main__":
+    main()
@@ -32,6 +32,7 @@ export default function ClassroomPage() {
     const [activeVideo, setActiveVideo] = useState<Video | null>(null);
     const [isLoading, setIsLoading] = useState(true);
     const [expandedModules, setExpandedModules] = useState<number[]>([]);
+    const [videoSrc, setVideoSrc] = useState<string | null>(null);
 
     useEffect(() => {
         if (params.courseId) {
@@ -39,6 +40,35 @@ export default function ClassroomPage() {
         }
     }, [params.courseId]);
 
+    // Media is served from short-lived signed URLs, requested per video
+    useEffect(() => {
+        if (!activeVideo) return;
+        if (activeVideo.url.startsWith("http")) {
+            setVideoSrc(activeVideo.url);
+            return;
+        }
+        setVideoSrc(null);
+        // Switching videos aborts the previous request, so a late response cannot win
+        const controller = new AbortController();
+        const token = localStorage.getItem("token");
+        fetch(`${API_URL}/media/videos/${activeVideo.id}/token`, {
+            method: "POST",
+            headers: { Authorization: `Bearer ${token}` },
+            signal: controller.signal,
+        })
+            .then(res => {
+                if (!res.ok) throw new Error("Video not available");
+                return res.json();
+            })
+            .then(data => {
+                if (!controller.signal.aborted) setVideoSrc(`${BASE_URL}${data.url}`);
+            })
+            .catch(err => {
+                if (!controller.signal.aborted) console.error(err);
+            });
+        return () => controller.abort();
+    }, [activeVideo]);
+
     const fetchCourse = async (id: string) => {
         try {
             const res = await fetch(`${API_URL}/courses/${id}`);
@@ -101,7 +131,7 @@ export default function ClassroomPage() {
                             <video
                                 controls
                                 className="w-full max-h-full aspect-video"
-                                src={activeVideo.url.startsWith("http") ? activeVideo.url : `${BASE_URL}${activeVideo.url}`}
+                                src={videoSrc ?? undefined}
                                 poster="/placeholder-video.jpg"
                             >
                                 Your browser does not support the video tag.